@@ -1,22 +1,105 @@
 import os
+import atexit
+import io
+import hmac
 import json
-import hashlib
+import logging
+import logging.handlers
+import functools
+import queue
+import random
 import time
-from datetime import datetime
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
 import boto3
+import boto3.session
+import botocore.session
+from botocore.config import Config as BotoConfig
+from boto3.s3.transfer import TransferConfig
+import orjson
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
-from flask import Flask, request, jsonify, redirect
-from flask_cors import CORS
+import psycopg2.pool
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Flask, Request, Response, request, jsonify, redirect
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from prometheus_flask_exporter import PrometheusMetrics
+from werkzeug.utils import secure_filename
 
 # -----------------------------------------------------------------------------
 # Application Setup
 # -----------------------------------------------------------------------------
+# Log records are queued and written to stderr by a listener thread, so request
+# threads never block on the stream write.
+_log_queue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used by jsonify() and request.get_json().
+
+    Naive datetimes are emitted as ISO-8601 UTC.
+    """
+    option = orjson.OPT_NAIVE_UTC
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.option), mimetype=self.mimetype)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 # Using a wildcard for now is fine for debugging, can be restricted later.
 ALLOWED_ORIGIN = os.environ.get("ALLOWED_ORIGIN", "*")
-CORS(app, resources={r"/api/*": {"origins": ALLOWED_ORIGIN}}, supports_credentials=True)
+CORS_ALLOW_METHODS = "GET, POST, OPTIONS"
+
+@app.after_request
+def add_cors_headers(response):
+    """Adds credentialed CORS headers to /api/* responses, preflights included.
+
+    A fixed ALLOWED_ORIGIN is sent as-is. With "*" the caller's Origin is echoed
+    back instead, since browsers reject a wildcard on credentialed requests.
+    """
+    if not request.path.startswith("/api/"):
+        return response
+    if ALLOWED_ORIGIN == "*":
+        origin = request.headers.get("Origin")
+        if not origin:
+            return response
+        response.vary.add("Origin")
+    else:
+        origin = ALLOWED_ORIGIN
+    headers = response.headers
+    headers["Access-Control-Allow-Origin"] = origin
+    headers["Access-Control-Allow-Credentials"] = "true"
+    if request.method == "OPTIONS":
+        headers["Access-Control-Allow-Methods"] = CORS_ALLOW_METHODS
+        requested_headers = request.headers.get("Access-Control-Request-Headers")
+        if requested_headers:
+            headers["Access-Control-Allow-Headers"] = requested_headers
+    return response
+
+# Compress JSON responses over 500 bytes, preferring Brotli when the client accepts it.
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_MIN_SIZE"] = 500
+Compress(app)
 
 metrics = PrometheusMetrics(app)
 url_shorten_counter = metrics.counter("url_shorten_requests", "Number of requests to shorten URL")
@@ -26,10 +109,34 @@ redirect_counter = metrics.counter("url_redirect_requests", "Number of requests
 # AWS Clients (S3, CloudWatch, etc., are still useful)
 # -----------------------------------------------------------------------------
 aws_region = os.environ.get("AWS_REGION", "us-east-1")
-s3_client = boto3.client("s3", region_name=aws_region)
-cloudwatch_client = boto3.client("cloudwatch", region_name=aws_region)
-ssm_client = boto3.client("ssm", region_name=aws_region)
-# NOTE: The secrets_client is no longer needed here.
+# One botocore session per process, so every client shares the same credential
+# resolver and endpoint data. Clients are built on first use.
+_aws_session = boto3.session.Session(botocore_session=botocore.session.Session(), region_name=aws_region)
+_aws_client_lock = threading.Lock()
+AWS_CLIENT_CONFIG = BotoConfig(max_pool_connections=50, retries={"max_attempts": 2, "mode": "standard"})
+# Metrics are best-effort, so CloudWatch calls fail fast rather than stall the publisher.
+AWS_SERVICE_CONFIG = {"cloudwatch": BotoConfig(connect_timeout=1, read_timeout=2)}
+
+@functools.lru_cache(maxsize=None)
+def _client(service_name):
+    config = AWS_CLIENT_CONFIG
+    if service_name in AWS_SERVICE_CONFIG:
+        config = config.merge(AWS_SERVICE_CONFIG[service_name])
+    # Session.client() is not thread-safe.
+    with _aws_client_lock:
+        return _aws_session.client(service_name, config=config)
+
+def warm_aws_clients():
+    """Builds the S3 and CloudWatch clients, resolving credentials for the shared
+    session, so the first upload or metrics flush does not pay for it.
+
+    Called by gunicorn's post_worker_init hook, once per worker before it serves.
+    """
+    for service_name in ("s3", "cloudwatch"):
+        try:
+            _client(service_name)
+        except Exception as e:
+            app.logger.warning("Failed to create %s client: %s", service_name, e)
 
 # -----------------------------------------------------------------------------
 # Configuration from Environment Variables
@@ -40,90 +147,738 @@ DB_USER = os.environ.get("DB_USER")
 # --- THIS IS THE KEY CHANGE ---
 # The password is now read directly from the environment, injected by ECS.
 DB_PASSWORD = os.environ.get("DB_PASSWORD")
+DB_ENV_MISSING = [name for name in ("DB_HOST", "DB_NAME", "DB_USER", "DB_PASSWORD") if not os.environ.get(name)]
 DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "5"))
+# Per-process pool bounds. Keep workers x DB_POOL_MAX below Postgres max_connections.
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+# Pooled connections idle for longer than this (seconds) are pinged before use.
+DB_PING_AFTER_IDLE = float(os.environ.get("DB_PING_AFTER_IDLE", "30"))
+# Arbitrary key for the advisory lock that serializes schema setup across workers.
+SCHEMA_LOCK_ID = 7402113
+# Max short codes kept in each worker's in-process redirect cache.
+REDIRECT_CACHE_SIZE = int(os.environ.get("REDIRECT_CACHE_SIZE", "10000"))
+# When > 0, redirects are permanent (301) and browsers/CDNs may cache them for this
+# many seconds. Cached repeat visits never reach the service, so they are not
+# counted as clicks; the default 0 keeps uncached 302s and exact click counts.
+REDIRECT_MAX_AGE = int(os.environ.get("REDIRECT_MAX_AGE", "0"))
 UPLOAD_BUCKET = os.environ.get("UPLOAD_BUCKET")
+# Uploads up to UPLOAD_SPOOL_SIZE stay in memory; larger ones spill to a temp file.
+UPLOAD_SPOOL_SIZE = int(os.environ.get("UPLOAD_SPOOL_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_MAX_SIZE = int(os.environ.get("UPLOAD_MAX_SIZE", str(100 * 1024 * 1024)))
 # Correctly read the BASE_URL variable name
 BASE_URL = os.environ.get("BASE_URL")
+BASE_URL_PREFIX = BASE_URL.rstrip("/") + "/" if BASE_URL else "/"
+# Set to "false" when the schema is created by running `flask --app app init-db` at deploy time.
+INIT_DB_ON_STARTUP = os.environ.get("INIT_DB_ON_STARTUP", "true").lower() == "true"
+# Click tracking is skipped entirely when this is not set.
+ANALYTICS_SERVICE_URL = os.environ.get("ANALYTICS_SERVICE_URL")
+ANALYTICS_WORKERS = int(os.environ.get("ANALYTICS_WORKERS", "4"))
+ANALYTICS_QUEUE_SIZE = int(os.environ.get("ANALYTICS_QUEUE_SIZE", "1000"))
+# Max URLs accepted by a single /api/shorten/bulk request.
+BULK_SHORTEN_MAX = int(os.environ.get("BULK_SHORTEN_MAX", "1000"))
+# Bearer token required by /api/links/import; the endpoint is disabled when unset.
+LINK_IMPORT_TOKEN = os.environ.get("LINK_IMPORT_TOKEN")
+# Bearer token required by /api/upload; uploads are disabled when unset.
+UPLOAD_TOKEN = os.environ.get("UPLOAD_TOKEN")
+# Max sub-requests accepted by a single /api/batch request.
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "20"))
+# Default and max page size for /api/links.
+LINKS_PAGE_SIZE = int(os.environ.get("LINKS_PAGE_SIZE", "100"))
+LINKS_PAGE_MAX = int(os.environ.get("LINKS_PAGE_MAX", "1000"))
+# Buffered CloudWatch datums are published at least this often (seconds).
+CLOUDWATCH_FLUSH_INTERVAL = float(os.environ.get("CLOUDWATCH_FLUSH_INTERVAL", "10"))
+# Buffered link_clicks rows are written at least this often (seconds).
+CLICK_FLUSH_INTERVAL = float(os.environ.get("CLICK_FLUSH_INTERVAL", "0.5"))
+
+class UploadRequest(Request):
+    """Request whose file uploads are spooled in memory up to UPLOAD_SPOOL_SIZE.
+
+    Werkzeug's default writes any multipart body over 500KB to disk before the
+    handler runs, only for upload_file() to read it back out to S3.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, mode="w+b")
+
+app.request_class = UploadRequest
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_SIZE
+
+# Multipart S3 uploads: files over 8MB go up in 16MB parts over 16 connections.
+# Each in-flight upload can buffer up to chunksize x concurrency (256MB by default),
+# so lower these when many large uploads may run at once.
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=int(os.environ.get("S3_MULTIPART_CHUNKSIZE", str(16 * 1024 * 1024))),
+    max_concurrency=int(os.environ.get("S3_MAX_CONCURRENCY", "16")),
+    use_threads=True,
+)
 
 # -----------------------------------------------------------------------------
 # Helper Functions
 # -----------------------------------------------------------------------------
-def get_db_connection():
-    """Returns a psycopg2 connection after checking for all required env vars."""
-    if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
-        raise RuntimeError("CRITICAL: One or more DB environment variables are not set (DB_HOST, DB_NAME, DB_USER, DB_PASSWORD).")
-    
-    return psycopg2.connect(
+def _check_db_env():
+    if DB_ENV_MISSING:
+        raise RuntimeError(f"CRITICAL: DB environment variables are not set: {', '.join(DB_ENV_MISSING)}.")
+
+def _db_params():
+    return dict(
         host=DB_HOST,
         database=DB_NAME,
         user=DB_USER,
         password=DB_PASSWORD,
         connect_timeout=DB_CONNECT_TIMEOUT,
+        # Let the kernel detect sockets silently dropped by NAT or proxies.
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
     )
 
-def ensure_tables_with_retry(retries=5, delay=5):
-    """Attempt to connect to the DB and create tables with retries on startup."""
+def get_db_connection():
+    """Returns a standalone psycopg2 connection. Request handlers should use db_conn() instead."""
+    _check_db_env()
+    return psycopg2.connect(**_db_params())
+
+# Hot-path statements PREPAREd once per pooled connection, so Postgres skips
+# parsing and planning them on every request. PREPARE is not transactional: if a
+# later statement fails (say base62() does not exist yet), the earlier ones stay
+# on the connection, so the batch clears them first to make a retry possible.
+PREPARED_STATEMENTS = """
+    DEALLOCATE ALL;
+    PREPARE lookup_code (varchar) AS
+        SELECT original_url FROM links WHERE short_code = $1;
+    PREPARE insert_link (text) AS
+        INSERT INTO links (id, short_code, original_url)
+        SELECT n, base62(n), $1 FROM (SELECT nextval(pg_get_serial_sequence('links', 'id')) AS n) AS s
+        ON CONFLICT (url_key(original_url)) DO UPDATE SET short_code = links.short_code
+        RETURNING short_code;
+"""
+
+class LinkConnection(psycopg2.extensions.connection):
+    """Connection that remembers whether PREPARED_STATEMENTS have been run on it,
+    and when it was last returned to the pool."""
+    prepared = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_used = time.monotonic()
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises PoolError when exhausted. With hundreds of gevent
+# greenlets per worker, callers wait on this semaphore for a free slot instead.
+_db_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+def get_db_pool():
+    """Returns this process's ThreadedConnectionPool, creating it on first use.
+
+    Creation is lazy so every gunicorn worker builds its own pool after fork
+    rather than inheriting sockets from the master.
+    """
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _check_db_env()
+                _db_pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, connection_factory=LinkConnection, **_db_params()
+                )
+    return _db_pool
+
+def _checkout(pool):
+    """Gets an autocommit connection from the pool, discarding any that died while idle.
+
+    Freshly opened connections are never pinged, so this ends once the idle
+    connections are used up even if all of them are dead.
+    """
+    while True:
+        conn = pool.getconn()
+        if not conn.autocommit:
+            conn.autocommit = True
+        if time.monotonic() - conn.last_used <= DB_PING_AFTER_IDLE:
+            return conn
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return conn
+        except psycopg2.OperationalError:
+            pool.putconn(conn, close=True)
+
+@contextmanager
+def db_conn():
+    """Checks an autocommit connection out of the pool for the duration of the block."""
+    pool = get_db_pool()
+    if not _db_pool_slots.acquire(timeout=DB_CONNECT_TIMEOUT):
+        raise psycopg2.pool.PoolError("timed out waiting for a pooled DB connection")
+    try:
+        conn = _checkout(pool)
+        try:
+            if not conn.prepared:
+                with conn.cursor() as cur:
+                    cur.execute(PREPARED_STATEMENTS)
+                conn.prepared = True
+            yield conn
+        finally:
+            # Broken connections are discarded so the pool reconnects on next checkout.
+            conn.last_used = time.monotonic()
+            pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        _db_pool_slots.release()
+
+# All link-service DDL, sent as one multi-statement query (one round trip). The
+# string runs as a single implicit transaction, so the transaction-scoped
+# advisory lock makes workers booting at the same time take turns and is
+# released automatically when the statements finish or fail.
+SCHEMA_SQL = """
+    SELECT pg_advisory_xact_lock(%(lock_id)d);
+
+    CREATE TABLE IF NOT EXISTS links (
+        id SERIAL PRIMARY KEY, short_code VARCHAR(16) UNIQUE NOT NULL,
+        original_url TEXT NOT NULL, created_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+    -- Click rows carry no surrogate key, so batched inserts never touch a sequence.
+    CREATE TABLE IF NOT EXISTS link_clicks (
+        short_code VARCHAR(16) NOT NULL, clicked_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+    -- Links are unique on a SHA-256 of the URL rather than the URL itself: btree
+    -- entries are capped at ~2.7KB, so a plain index would reject long URLs. The
+    -- digest must be collision-resistant because two URLs sharing a key would
+    -- share a short code. convert_to() is only STABLE, but the database encoding
+    -- never changes, so the wrapper is safe to mark IMMUTABLE for indexing.
+    CREATE OR REPLACE FUNCTION url_key(url TEXT) RETURNS BYTEA AS $$
+        SELECT sha256(convert_to(url, 'UTF8'))
+    $$ LANGUAGE sql IMMUTABLE STRICT;
+
+    -- CREATE INDEX IF NOT EXISTS still takes a ShareLock on the table, blocking
+    -- inserts, so indexes are only created when to_regclass() cannot find them.
+    DO $$
+    BEGIN
+        IF to_regclass('links_original_url_sha256_key') IS NULL THEN
+            CREATE UNIQUE INDEX links_original_url_sha256_key ON links (url_key(original_url));
+        END IF;
+        -- Backs the keyset pagination in get_links(). short_code lookups already
+        -- use the index behind its UNIQUE constraint.
+        IF to_regclass('links_created_at_idx') IS NULL THEN
+            CREATE INDEX links_created_at_idx ON links (created_at DESC, id DESC);
+        END IF;
+    END
+    $$;
+    DROP INDEX IF EXISTS links_original_url_key;
+    DROP INDEX IF EXISTS links_original_url_md5_key;
+
+    -- Short codes are base62(id): unique by construction, so no hashing or
+    -- collision handling is needed. Older hash-based codes are 8 characters,
+    -- which base62 ids will not reach for ~3.5 trillion rows.
+    CREATE OR REPLACE FUNCTION base62(n BIGINT) RETURNS TEXT AS $$
+    DECLARE
+        alphabet CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz';
+        code TEXT := '';
+    BEGIN
+        LOOP
+            code := substr(alphabet, (n %% 62)::INT + 1, 1) || code;
+            n := n / 62;
+            EXIT WHEN n = 0;
+        END LOOP;
+        RETURN code;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE STRICT;
+
+    -- Per-link click lookups and time-range counts would otherwise scan the
+    -- whole clicks table. ALTER TABLE and CREATE INDEX lock link_clicks even when
+    -- there is nothing to do, so both only run when the catalog says they must;
+    -- otherwise every worker boot would stall the running click writers.
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'link_clicks' AND column_name = 'id'
+        ) THEN
+            ALTER TABLE link_clicks DROP COLUMN id;
+        END IF;
+        IF to_regclass('link_clicks_short_code_clicked_at_idx') IS NULL THEN
+            CREATE INDEX link_clicks_short_code_clicked_at_idx ON link_clicks (short_code, clicked_at);
+        END IF;
+    END
+    $$;
+    DROP INDEX IF EXISTS link_clicks_short_code_idx;
+""" % {"lock_id": SCHEMA_LOCK_ID}
+
+def ensure_tables(conn):
+    """Creates the link-service tables, indexes and functions if missing."""
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+
+def ensure_tables_with_retry(retries=8, base_delay=0.5, max_delay=30):
+    """Attempt to connect to the DB and create tables with retries on startup.
+
+    Waits grow exponentially with random jitter, so workers booting together
+    do not retry against the database in lockstep.
+    """
+    _check_db_env()  # Missing config will not fix itself; fail before retrying.
     for i in range(retries):
         try:
-            print(f"DB connection attempt {i+1}/{retries}...")
+            app.logger.info("DB connection attempt %d/%d...", i + 1, retries)
             conn = get_db_connection()
-            conn.autocommit = True
-            with conn.cursor() as cur:
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS links (
-                        id SERIAL PRIMARY KEY, short_code VARCHAR(16) UNIQUE NOT NULL,
-                        original_url TEXT NOT NULL, created_at TIMESTAMP NOT NULL DEFAULT NOW()
-                    );
-                """)
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS link_clicks (
-                        id SERIAL PRIMARY KEY, short_code VARCHAR(16) NOT NULL,
-                        clicked_at TIMESTAMP NOT NULL DEFAULT NOW()
-                    );
-                """)
-            conn.close()
-            print("Database tables checked/created successfully.")
+            try:
+                conn.autocommit = True
+                ensure_tables(conn)
+            finally:
+                conn.close()
+            app.logger.info("Database tables checked/created successfully.")
             return # Success
         except Exception as e:
-            print(f"DB connection failed: {e}. Retrying in {delay} seconds...")
+            if i == retries - 1:
+                app.logger.warning("DB connection failed: %s", e)
+                break
+            delay = min(max_delay, base_delay * 2 ** i) + random.uniform(0, base_delay)
+            app.logger.warning("DB connection failed: %s. Retrying in %.1f seconds...", e, delay)
             time.sleep(delay)
     raise RuntimeError("Could not connect to the database after multiple retries.")
 
-# ... (make_short_code, log_to_cloudwatch, and get_app_config remain the same) ...
-def make_short_code(original_url: str) -> str:
-    h = hashlib.sha256(f"{original_url}-{time.time()}".encode("utf-8")).hexdigest()
-    return h[:8]
+def drain_queue(q, max_items, interval):
+    """Blocks for one item, then collects more until max_items or interval seconds pass."""
+    batch = [q.get()]
+    deadline = time.monotonic() + interval
+    while len(batch) < max_items:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(q.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
 
-def log_to_cloudwatch(metric_name, value, unit="Count", namespace="LinkService"):
-    try:
-        cloudwatch_client.put_metric_data(Namespace=namespace, MetricData=[{"MetricName": metric_name, "Value": value, "Unit": unit}])
-    except Exception as e:
-        print(f"Failed to log CloudWatch metric {metric_name}: {e}")
+_started_workers = set()
+_started_workers_lock = threading.Lock()
+
+def start_background(name, target, count=1):
+    """Starts count daemon threads running target the first time name is requested.
+
+    Workers are started by the first call that needs them rather than at import,
+    so CLI commands and tests that import the app never spin them up.
+    """
+    if name in _started_workers:
+        return
+    with _started_workers_lock:
+        if name in _started_workers:
+            return
+        for _ in range(count):
+            threading.Thread(target=target, name=name, daemon=True).start()
+        _started_workers.add(name)
+
+def has_bearer_token(token):
+    """True when the request's Authorization header carries exactly this bearer token."""
+    auth = request.headers.get("Authorization", "")
+    return hmac.compare_digest(auth.encode(), f"Bearer {token}".encode())
+
+def short_url_for(short_code: str) -> str:
+    return f"{BASE_URL_PREFIX}{short_code}"
+
+@functools.lru_cache(maxsize=REDIRECT_CACHE_SIZE)
+def _resolve(short_code: str) -> str:
+    """Looks up the original URL for a short code, cached per process.
+
+    Links are never updated once created, so entries cannot go stale; call
+    _resolve.cache_clear() if a delete path is ever added. Unknown codes raise
+    KeyError rather than returning None so that misses are not cached.
+    """
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("EXECUTE lookup_code (%s)", (short_code,))
+            row = cur.fetchone()
+    if row is None:
+        raise KeyError(short_code)
+    return row[0]
 
 def get_app_config():
     # This function remains the same
     pass
 
 # -----------------------------------------------------------------------------
-# Flask Routes (Unchanged)
+# CloudWatch Metrics
 # -----------------------------------------------------------------------------
+# Events are summed in-process per (namespace, metric, unit) and published by a
+# background thread every CLOUDWATCH_FLUSH_INTERVAL seconds, so each interval
+# costs at most one datum per metric instead of one API call per event.
+CLOUDWATCH_BATCH_SIZE = 1000
+_metric_counts = Counter()
+_metric_lock = threading.Lock()
+
+def log_to_cloudwatch(metric_name, value, unit="Count", namespace="LinkService"):
+    """Adds value to the pending total for this metric; the publisher sends the sum."""
+    start_background("cloudwatch-publisher", _cloudwatch_publisher)
+    with _metric_lock:
+        _metric_counts[(namespace, metric_name, unit)] += value
+
+def _cloudwatch_publisher():
+    global _metric_counts
+    while True:
+        time.sleep(CLOUDWATCH_FLUSH_INTERVAL)
+        with _metric_lock:
+            counts, _metric_counts = _metric_counts, Counter()
+        if not counts:
+            continue
+        now = datetime.now(timezone.utc)
+        by_namespace = defaultdict(list)
+        for (namespace, metric_name, unit), value in counts.items():
+            by_namespace[namespace].append({"MetricName": metric_name, "Value": value, "Unit": unit, "Timestamp": now})
+        for namespace, data in by_namespace.items():
+            for i in range(0, len(data), CLOUDWATCH_BATCH_SIZE):
+                chunk = data[i:i + CLOUDWATCH_BATCH_SIZE]
+                try:
+                    _client("cloudwatch").put_metric_data(Namespace=namespace, MetricData=chunk)
+                except Exception as e:
+                    app.logger.warning("Failed to publish %d CloudWatch datums: %s", len(chunk), e)
+
+# -----------------------------------------------------------------------------
+# Click Logging
+# -----------------------------------------------------------------------------
+# Redirects only enqueue their link_clicks row; a background thread writes them
+# with one execute_values INSERT per batch of up to CLICK_BATCH_SIZE rows.
+CLICK_BATCH_SIZE = 500
+_click_queue = queue.Queue(maxsize=10000)
+
+def record_click(short_code):
+    """Queues a link_clicks row without blocking; drops it if the buffer is full."""
+    start_background("click-writer", _click_writer)
+    try:
+        _click_queue.put_nowait((short_code, datetime.utcnow()))
+    except queue.Full:
+        pass
+
+def _click_writer():
+    while True:
+        batch = drain_queue(_click_queue, CLICK_BATCH_SIZE, CLICK_FLUSH_INTERVAL)
+        try:
+            with db_conn() as conn:
+                with conn.cursor() as cur:
+                    psycopg2.extras.execute_values(
+                        cur,
+                        "INSERT INTO link_clicks (short_code, clicked_at) VALUES %s",
+                        batch,
+                        page_size=len(batch),
+                    )
+        except Exception as e:
+            app.logger.warning("Failed to write %d link clicks: %s", len(batch), e)
+
+# -----------------------------------------------------------------------------
+# Analytics Tracking
+# -----------------------------------------------------------------------------
+# Clicks are posted to the analytics service by background threads so that a
+# slow or unavailable analytics service never delays a redirect.
+_http = requests.Session()
+_http.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=50))
+_http.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=50))
+_analytics_queue = queue.Queue(maxsize=ANALYTICS_QUEUE_SIZE)
+
+def _analytics_worker():
+    track_url = f"{ANALYTICS_SERVICE_URL.rstrip('/')}/api/track"
+    while True:
+        short_code = _analytics_queue.get()
+        try:
+            _http.post(track_url, json={"short_code": short_code}, timeout=2)
+        except Exception as e:
+            app.logger.warning("Failed to track click for %s: %s", short_code, e)
+
+def track_click(short_code):
+    """Queues a click for the analytics service without blocking; drops it if the queue is full."""
+    if not ANALYTICS_SERVICE_URL:
+        return
+    start_background("analytics-tracker", _analytics_worker, ANALYTICS_WORKERS)
+    try:
+        _analytics_queue.put_nowait(short_code)
+    except queue.Full:
+        pass
+
+# -----------------------------------------------------------------------------
+# Flask Routes
+# -----------------------------------------------------------------------------
+HEALTH_BODY = b'{"status":"ok"}'
+
 @app.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok", "time": datetime.utcnow().isoformat() + "Z"}), 200
+    # Hit constantly by ALB/ECS health checks, which only look at the status code.
+    return Response(HEALTH_BODY, status=200, mimetype="application/json")
+
+# Postgres serializes the whole page into one JSON array, so rows are never
+# materialized as Python objects. It also returns the last row's key for the
+# next cursor. The %s is an optional keyset WHERE clause.
+LINKS_PAGE_SQL = """
+    SELECT COALESCE(json_agg(json_build_object(
+               'short_code', short_code, 'original_url', original_url,
+               'created_at', to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"')
+           ) ORDER BY created_at DESC, id DESC), '[]')::text,
+           count(*),
+           (array_agg(created_at ORDER BY created_at, id))[1],
+           (array_agg(id ORDER BY created_at, id))[1]
+    FROM (
+        SELECT id, short_code, original_url, created_at FROM links
+        %s ORDER BY created_at DESC, id DESC LIMIT %%s
+    ) AS page
+"""
 
-# ... (All your other routes like /api/links, /api/shorten, etc., remain exactly the same) ...
 @app.route("/api/links", methods=["GET"])
 def get_links():
-    conn = get_db_connection()
-    # ...
-    return jsonify({"links": []})
+    """Returns links newest first, one page at a time.
+
+    Pass the returned next_cursor back as ?cursor= to fetch the following page.
+    The cursor is "<created_at>_<id>", so rows sharing a timestamp are not skipped.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", LINKS_PAGE_SIZE)), 1), LINKS_PAGE_MAX)
+        cursor = request.args.get("cursor")
+        after = None
+        if cursor:
+            created_at, _, link_id = cursor.rpartition("_")
+            after = (datetime.fromisoformat(created_at), int(link_id))
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    try:
+        with db_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(LINKS_PAGE_SQL % ("WHERE (created_at, id) < (%s, %s)" if after else ""), (*(after or ()), limit))
+                links_json, count, last_created_at, last_id = cur.fetchone()
+        next_cursor = f"{last_created_at.isoformat()}_{last_id}" if count == limit else None
+        body = b'{"links":' + links_json.encode() + b',"next_cursor":' + orjson.dumps(next_cursor) + b"}"
+        return Response(body, status=200, mimetype="application/json")
+    except Exception:
+        app.logger.exception("get_links error")
+        return jsonify({"error": "Failed to fetch links"}), 500
+
+@app.route("/api/shorten", methods=["POST"])
+@url_shorten_counter
+def shorten_url():
+    data = request.get_json(silent=True)
+    original_url = data.get("url") if isinstance(data, dict) else None
+    original_url = original_url.strip() if isinstance(original_url, str) else ""
+    if not original_url:
+        return jsonify({"error": "URL is required"}), 400
+
+    try:
+        with db_conn() as conn:
+            with conn.cursor() as cur:
+                # insert_link's no-op DO UPDATE (rather than DO NOTHING) makes RETURNING
+                # yield the existing code when the URL was shortened before.
+                cur.execute("EXECUTE insert_link (%s)", (original_url,))
+                short_code = cur.fetchone()[0]
+    except Exception:
+        app.logger.exception("shorten_url error")
+        return jsonify({"error": "Failed to shorten URL"}), 500
 
-# ... etc ...
+    log_to_cloudwatch("URLsShortened", 1)
+    return jsonify({"short_code": short_code, "short_url": short_url_for(short_code), "original_url": original_url}), 201
+
+@app.route("/api/shorten/bulk", methods=["POST"])
+@url_shorten_counter
+def shorten_urls_bulk():
+    """Shortens a list of URLs in a single execute_values round trip.
+
+    URLs that already have a short code get the existing one back.
+    """
+    data = request.get_json(silent=True)
+    urls = data.get("urls") if isinstance(data, dict) else None
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "urls must be a non-empty list"}), 400
+    if len(urls) > BULK_SHORTEN_MAX:
+        return jsonify({"error": f"At most {BULK_SHORTEN_MAX} URLs per request"}), 400
+    # Preserve request order while dropping blanks and duplicates.
+    urls = list(dict.fromkeys(u.strip() for u in urls if isinstance(u, str) and u.strip()))
+    if not urls:
+        return jsonify({"error": "urls must be a non-empty list"}), 400
+
+    try:
+        with db_conn() as conn:
+            with conn.cursor() as cur:
+                # nextval() sits in a subquery so it runs once per row; see insert_link.
+                codes = dict(psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO links (id, short_code, original_url) "
+                    "SELECT n, base62(n), url FROM ("
+                    "SELECT nextval(pg_get_serial_sequence('links', 'id')) AS n, url FROM (VALUES %s) AS v (url)"
+                    ") AS s "
+                    "ON CONFLICT (url_key(original_url)) DO UPDATE SET short_code = links.short_code "
+                    "RETURNING original_url, short_code",
+                    [(u,) for u in urls],
+                    page_size=len(urls),
+                    fetch=True,
+                ))
+    except Exception:
+        app.logger.exception("shorten_urls_bulk error")
+        return jsonify({"error": "Failed to shorten URLs"}), 500
+
+    log_to_cloudwatch("URLsShortened", len(urls))
+    links = [
+        {"short_code": codes[u], "short_url": short_url_for(codes[u]), "original_url": u}
+        for u in urls if u in codes
+    ]
+    return jsonify({"links": links}), 201
+
+@app.route("/api/links/import", methods=["POST"])
+def import_links():
+    """Bulk-loads newline-delimited URLs with COPY, for seeding and admin imports.
+
+    Rows go into a temp table via COPY and are then inserted with one
+    INSERT ... SELECT, so the cost is a handful of round trips for any size.
+    URLs that already exist are skipped.
+    """
+    if not LINK_IMPORT_TOKEN:
+        return jsonify({"error": "Link import is disabled"}), 403
+    if not has_bearer_token(LINK_IMPORT_TOKEN):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    urls = [line.strip() for line in request.get_data(as_text=True).splitlines() if line.strip()]
+    if not urls:
+        return jsonify({"error": "No URLs provided"}), 400
+    # Escape the characters that are special in COPY's text format.
+    payload = "".join(u.replace("\\", "\\\\").replace("\t", "\\t") + "\n" for u in urls)
+
+    try:
+        with db_conn() as conn:
+            # Pooled connections are autocommit; let psycopg2 own this transaction
+            # so that any exception, BaseException included, rolls it back.
+            conn.autocommit = False
+            try:
+                with conn, conn.cursor() as cur:
+                    cur.execute("CREATE TEMP TABLE link_import (original_url TEXT NOT NULL) ON COMMIT DROP")
+                    cur.copy_expert("COPY link_import (original_url) FROM STDIN", io.StringIO(payload))
+                    cur.execute("""
+                        INSERT INTO links (id, short_code, original_url)
+                        SELECT n, base62(n), original_url FROM (
+                            SELECT nextval(pg_get_serial_sequence('links', 'id')) AS n, original_url
+                            FROM (SELECT DISTINCT original_url FROM link_import) AS d
+                        ) AS s
+                        ON CONFLICT (url_key(original_url)) DO NOTHING
+                    """)
+                    imported = cur.rowcount
+            finally:
+                # If the rollback itself failed, stay out of autocommit so the pool's
+                # putconn() still rolls back; _checkout() re-enables it on next use.
+                if not conn.closed and conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.autocommit = True
+    except Exception:
+        app.logger.exception("import_links error")
+        return jsonify({"error": "Failed to import links"}), 500
+
+    log_to_cloudwatch("URLsShortened", imported)
+    return jsonify({"received": len(urls), "imported": imported}), 201
+
+# Links are never updated or deleted, so a cached redirect cannot go stale.
+REDIRECT_CACHE_CONTROL = f"public, max-age={REDIRECT_MAX_AGE}, immutable"
+
+@app.route("/<short_code>", methods=["GET"])
+@redirect_counter
+def redirect_url(short_code):
+    try:
+        original_url = _resolve(short_code)
+    except KeyError:
+        return jsonify({"error": "Short URL not found"}), 404
+    except Exception:
+        app.logger.exception("redirect_url error")
+        return jsonify({"error": "Failed to redirect"}), 500
+
+    record_click(short_code)
+    track_click(short_code)
+    if not REDIRECT_MAX_AGE:
+        return redirect(original_url, code=302)
+    response = redirect(original_url, code=301)
+    response.headers["Cache-Control"] = REDIRECT_CACHE_CONTROL
+    return response
+
+@app.route("/api/upload", methods=["POST"])
+def upload_file():
+    """Streams one multipart "file" to UPLOAD_BUCKET; requires the UPLOAD_TOKEN bearer token."""
+    if not UPLOAD_BUCKET:
+        return jsonify({"error": "File uploads are not configured"}), 503
+    if not UPLOAD_TOKEN:
+        return jsonify({"error": "File uploads are disabled"}), 403
+    if not has_bearer_token(UPLOAD_TOKEN):
+        return jsonify({"error": "Unauthorized"}), 401
+    file = request.files.get("file")
+    if file is None or not file.filename:
+        return jsonify({"error": "No file provided"}), 400
+
+    file_key = f"uploads/{uuid.uuid4().hex}-{secure_filename(file.filename)}"
+    try:
+        _client("s3").upload_fileobj(
+            file.stream,
+            UPLOAD_BUCKET,
+            file_key,
+            # Never trust the client's content type: stored as-is, a text/html
+            # upload would render if the bucket were ever served to browsers.
+            ExtraArgs={"ContentType": "application/octet-stream", "ContentDisposition": "attachment"},
+            Config=S3_TRANSFER_CONFIG,
+        )
+    except Exception:
+        app.logger.exception("upload_file error")
+        return jsonify({"error": "Failed to upload file"}), 500
+
+    log_to_cloudwatch("FilesUploaded", 1)
+    return jsonify({"file_key": file_key}), 201
+
+BATCH_SUBREQUEST_KEY = "link_service.batch_subrequest"
+
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    """Runs several API calls in-process and returns their results in one response.
+
+    Body: {"requests": [{"method": "GET", "path": "/api/links"}, ...]}. POST
+    sub-requests may carry a JSON "body". Results come back in request order.
+    """
+    data = request.get_json(silent=True)
+    subrequests = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(subrequests, list) or not subrequests:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+    if len(subrequests) > BATCH_MAX_REQUESTS:
+        return jsonify({"error": f"At most {BATCH_MAX_REQUESTS} requests per batch"}), 400
+    # Sub-requests are tagged in their WSGI environ, so a nested batch is refused
+    # however its path is spelled (e.g. /%61pi/batch).
+    if request.environ.get(BATCH_SUBREQUEST_KEY):
+        return jsonify({"error": "Batch requests cannot be nested"}), 400
+
+    client = app.test_client()
+    responses = []
+    for sub in subrequests:
+        sub = sub if isinstance(sub, dict) else {}
+        method = str(sub.get("method", "GET")).upper()
+        path = sub.get("path")
+        if method not in ("GET", "POST") or not isinstance(path, str) or not path.startswith("/"):
+            # Only echo string paths; arbitrary JSON could be too deep to encode.
+            responses.append({
+                "path": path if isinstance(path, str) else None,
+                "status": 400,
+                "body": {"error": "Invalid sub-request"},
+            })
+            continue
+        resp = client.open(
+            path,
+            method=method,
+            json=sub.get("body") if method == "POST" else None,
+            environ_base={BATCH_SUBREQUEST_KEY: True},
+        )
+        result = {"path": path, "status": resp.status_code, "body": resp.get_json(silent=True)}
+        if resp.location:
+            result["location"] = resp.location
+        elif result["body"] is None:
+            result["body"] = resp.get_data(as_text=True)
+        responses.append(result)
+    return jsonify({"responses": responses}), 200
 
 # -----------------------------------------------------------------------------
 # Startup Logic
 # -----------------------------------------------------------------------------
-if __name__ != "__main__":
-    # This runs when Gunicorn starts the app. It's more resilient than a simple try/except.
+@app.cli.command("init-db")
+def init_db_command():
+    """Create the link-service tables and exit."""
     ensure_tables_with_retry()
 
+# The flask CLI imports this module before running a command; `init-db` creates
+# the schema itself, so skip the import-time run there.
+if __name__ != "__main__" and INIT_DB_ON_STARTUP and os.environ.get("FLASK_RUN_FROM_CLI") != "true":
+    # This runs when Gunicorn starts the app. It's more resilient than a simple try/except.
+    ensure_tables_with_retry()
+elif __name__ == "__main__":
+    # Local development server (`python3 app.py`); production runs under gunicorn.
+    ensure_tables_with_retry()
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "3000")))
@@ -0,0 +1,59 @@
+"""Gunicorn settings for link-service.
+
+Requests spend nearly all their time waiting on Postgres, S3, CloudWatch and the
+analytics service, so workers use gevent: each process keeps many requests in
+flight instead of blocking a whole thread per network call.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+
+
+def _available_cpus():
+    """CPUs this process may actually use: the cgroup CPU quota when the container
+    has one (ECS/Docker --cpus), else the scheduler affinity mask."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    for quota_path, period_path in (
+        ("/sys/fs/cgroup/cpu.max", None),  # cgroup v2: "<quota> <period>"
+        ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "/sys/fs/cgroup/cpu/cpu.cfs_period_us"),  # cgroup v1
+    ):
+        try:
+            with open(quota_path) as f:
+                quota, *rest = f.read().split()
+            if period_path:
+                with open(period_path) as f:
+                    rest = f.read().split()
+            if quota not in ("max", "-1"):
+                return max(1, min(cpus, round(int(quota) / int(rest[0]))))
+            return cpus
+        except (OSError, ValueError, IndexError):
+            continue
+    return cpus
+
+
+# Each worker holds up to DB_POOL_MAX pooled connections, plus one more while it
+# creates the schema at boot. Workers share whatever DB_MAX_CONNECTIONS (Postgres'
+# max_connections, 100 by default) leaves after DB_RESERVED_CONNECTIONS, which
+# covers superuser_reserved_connections (3), the analytics-service pool (10) and
+# a couple for admin sessions.
+_db_pool_max = int(os.environ.get("DB_POOL_MAX", "10"))
+_db_max_connections = int(os.environ.get("DB_MAX_CONNECTIONS", "100"))
+_db_reserved_connections = int(os.environ.get("DB_RESERVED_CONNECTIONS", "15"))
+_db_worker_budget = (_db_max_connections - _db_reserved_connections) // (_db_pool_max + 1)
+_default_workers = max(1, min(_available_cpus() * 2 + 1, _db_worker_budget))
+workers = int(os.environ.get("GUNICORN_WORKERS", _default_workers))
+worker_class = "gevent"
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "500"))
+
+
+def post_fork(server, worker):
+    # Let psycopg2 yield to other greenlets while it waits on the database.
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def post_worker_init(worker):
+    # Resolve AWS credentials before the worker takes traffic, not inside its
+    # first upload. The app module is already imported by now.
+    from app import warm_aws_clients
+    warm_aws_clients()
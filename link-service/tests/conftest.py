@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+# Importing app must not try to create the schema; DB tests do that explicitly.
+os.environ.setdefault("INIT_DB_ON_STARTUP", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as link_app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return link_app.app.test_client()
+
+
+@pytest.fixture
+def db():
+    """A connection to a freshly created link-service schema.
+
+    Skipped unless DB_HOST (and the other DB_* variables) point at a Postgres
+    the tests may write to; every table is dropped afterwards.
+    """
+    if not os.environ.get("DB_HOST"):
+        pytest.skip("DB_HOST is not set")
+    conn = link_app.get_db_connection()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS links, link_clicks CASCADE")
+    link_app.ensure_tables(conn)
+    link_app._resolve.cache_clear()
+    yield conn
+    link_app._resolve.cache_clear()
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS links, link_clicks CASCADE")
+    conn.close()
@@ -0,0 +1,125 @@
+"""Request validation and header handling that never reaches the database."""
+import io
+
+import pytest
+
+import app as link_app
+
+AUTH = {"Authorization": "Bearer test-token"}
+
+
+def test_health(client):
+    response = client.get("/api/health")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+
+
+@pytest.mark.parametrize("query", [
+    "limit=abc",
+    "cursor=abc",
+    "cursor=2024-01-01T00:00:00",
+    "cursor=2024-01-01T00:00:00_x",
+    "cursor=not-a-date_5",
+])
+def test_get_links_rejects_bad_limit_or_cursor(client, query):
+    response = client.get(f"/api/links?{query}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid limit or cursor"}
+
+
+@pytest.mark.parametrize("body", [None, {}, {"url": ""}, {"url": "   "}, ["x"], {"url": 5}, {"url": ["x"]}])
+def test_shorten_requires_url(client, body):
+    assert client.post("/api/shorten", json=body).status_code == 400
+
+
+@pytest.mark.parametrize("body", [{}, ["x"], {"urls": []}, {"urls": "https://a"}, {"urls": ["", "  ", 5]}])
+def test_bulk_shorten_requires_url_list(client, body):
+    assert client.post("/api/shorten/bulk", json=body).status_code == 400
+
+
+def test_bulk_shorten_caps_url_count(client):
+    urls = [f"https://example.com/{i}" for i in range(link_app.BULK_SHORTEN_MAX + 1)]
+    assert client.post("/api/shorten/bulk", json={"urls": urls}).status_code == 400
+
+
+def test_import_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(link_app, "LINK_IMPORT_TOKEN", None)
+    assert client.post("/api/links/import", data="https://a\n", headers=AUTH).status_code == 403
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}, {"Authorization": "test-token"}])
+def test_import_requires_bearer_token(client, monkeypatch, headers):
+    monkeypatch.setattr(link_app, "LINK_IMPORT_TOKEN", "test-token")
+    assert client.post("/api/links/import", data="https://a\n", headers=headers).status_code == 401
+
+
+def test_import_requires_urls(client, monkeypatch):
+    monkeypatch.setattr(link_app, "LINK_IMPORT_TOKEN", "test-token")
+    assert client.post("/api/links/import", data="\n  \n", headers=AUTH).status_code == 400
+
+
+def test_upload_disabled_without_bucket(client, monkeypatch):
+    monkeypatch.setattr(link_app, "UPLOAD_BUCKET", None)
+    assert client.post("/api/upload").status_code == 503
+
+
+def test_upload_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(link_app, "UPLOAD_BUCKET", "bucket")
+    monkeypatch.setattr(link_app, "UPLOAD_TOKEN", None)
+    assert client.post("/api/upload", headers=AUTH).status_code == 403
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}])
+def test_upload_requires_bearer_token(client, monkeypatch, headers):
+    monkeypatch.setattr(link_app, "UPLOAD_BUCKET", "bucket")
+    monkeypatch.setattr(link_app, "UPLOAD_TOKEN", "test-token")
+    assert client.post("/api/upload", headers=headers).status_code == 401
+
+
+def test_upload_ignores_client_content_type(client, monkeypatch):
+    uploads = []
+
+    class FakeS3:
+        def upload_fileobj(self, fileobj, bucket, key, ExtraArgs, Config):
+            uploads.append((bucket, key, fileobj.read(), ExtraArgs))
+
+    monkeypatch.setattr(link_app, "UPLOAD_BUCKET", "bucket")
+    monkeypatch.setattr(link_app, "UPLOAD_TOKEN", "test-token")
+    monkeypatch.setattr(link_app, "_client", lambda name: FakeS3())
+    monkeypatch.setattr(link_app, "log_to_cloudwatch", lambda *args, **kwargs: None)
+    data = {"file": (io.BytesIO(b"<script>x</script>"), "page.html", "text/html")}
+    response = client.post("/api/upload", data=data, headers=AUTH, content_type="multipart/form-data")
+    assert response.status_code == 201
+    [(bucket, key, body, extra_args)] = uploads
+    assert (bucket, key, body) == ("bucket", response.get_json()["file_key"], b"<script>x</script>")
+    assert extra_args == {"ContentType": "application/octet-stream", "ContentDisposition": "attachment"}
+
+
+def test_cors_preflight_echoes_origin_for_wildcard(client, monkeypatch):
+    monkeypatch.setattr(link_app, "ALLOWED_ORIGIN", "*")
+    response = client.options("/api/shorten", headers={
+        "Origin": "https://app.example.com",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "content-type",
+    })
+    assert response.status_code == 200
+    assert response.headers["Access-Control-Allow-Origin"] == "https://app.example.com"
+    assert response.headers["Access-Control-Allow-Credentials"] == "true"
+    assert response.headers["Access-Control-Allow-Methods"] == link_app.CORS_ALLOW_METHODS
+    assert response.headers["Access-Control-Allow-Headers"] == "content-type"
+    assert "Origin" in response.vary
+
+
+def test_cors_fixed_origin_is_sent_as_is(client, monkeypatch):
+    monkeypatch.setattr(link_app, "ALLOWED_ORIGIN", "https://app.example.com")
+    response = client.get("/api/health", headers={"Origin": "https://other.example.com"})
+    assert response.headers["Access-Control-Allow-Origin"] == "https://app.example.com"
+    assert "Access-Control-Allow-Methods" not in response.headers
+
+
+def test_cors_headers_only_on_api_routes(client, monkeypatch):
+    monkeypatch.setattr(link_app, "ALLOWED_ORIGIN", "*")
+    response = client.get("/api/health")
+    assert "Access-Control-Allow-Origin" not in response.headers
+    response = client.options("/abc", headers={"Origin": "https://app.example.com"})
+    assert "Access-Control-Allow-Origin" not in response.headers
@@ -0,0 +1,56 @@
+import pytest
+
+import app as link_app
+
+
+def run_batch(client, subrequests):
+    response = client.post("/api/batch", json={"requests": subrequests})
+    assert response.status_code == 200
+    return response.get_json()["responses"]
+
+
+@pytest.mark.parametrize("body", [{}, ["x"], {"requests": []}, {"requests": "nope"}])
+def test_batch_requires_a_request_list(client, body):
+    assert client.post("/api/batch", json=body).status_code == 400
+
+
+def test_batch_caps_request_count(client):
+    subrequests = [{"method": "GET", "path": "/api/health"}] * (link_app.BATCH_MAX_REQUESTS + 1)
+    assert client.post("/api/batch", json={"requests": subrequests}).status_code == 400
+
+
+def test_batch_runs_subrequests_in_order(client):
+    responses = run_batch(client, [
+        {"method": "GET", "path": "/api/health"},
+        {"method": "GET", "path": "/api/links?limit=x"},
+    ])
+    assert [r["status"] for r in responses] == [200, 400]
+    assert responses[0]["body"] == {"status": "ok"}
+
+
+@pytest.mark.parametrize("sub", [
+    {"method": "DELETE", "path": "/api/health"},
+    {"method": "GET", "path": "api/health"},
+    {"method": "GET"},
+    "not-an-object",
+])
+def test_batch_rejects_invalid_subrequests(client, sub):
+    assert run_batch(client, [sub])[0]["status"] == 400
+
+
+@pytest.mark.parametrize("path", ["/api/batch", "/%61pi/batch", "/api/%62atch"])
+def test_batch_cannot_be_nested(client, path):
+    inner = {"requests": [{"method": "GET", "path": "/api/health"}]}
+    [result] = run_batch(client, [{"method": "POST", "path": path, "body": inner}])
+    assert result["status"] == 400
+    assert result["body"] == {"error": "Batch requests cannot be nested"}
+
+
+def test_batch_does_not_echo_non_string_paths(client):
+    # Deeper than orjson will encode, so it is sent as raw JSON text.
+    deep = "[" * 300 + "]" * 300
+    body = '{"requests": [{"method": "GET", "path": %s}]}' % deep
+    response = client.post("/api/batch", data=body, content_type="application/json")
+    assert response.status_code == 200
+    [result] = response.get_json()["responses"]
+    assert result == {"path": None, "status": 400, "body": {"error": "Invalid sub-request"}}
@@ -0,0 +1,24 @@
+import psycopg2
+import pytest
+
+import app as link_app
+
+
+def test_failed_prepare_does_not_poison_pooled_connection(db, client):
+    # Serve a request before base62() exists, as happens when INIT_DB_ON_STARTUP
+    # is off and init-db has not run yet: lookup_code prepares, insert_link fails.
+    with db.cursor() as cur:
+        cur.execute("DROP FUNCTION base62(BIGINT)")
+    with pytest.raises(psycopg2.errors.UndefinedFunction):
+        with link_app.db_conn():
+            pass
+
+    link_app.ensure_tables(db)
+
+    for _ in range(link_app.DB_POOL_MAX):
+        with link_app.db_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("EXECUTE lookup_code (%s)", ("missing",))
+                assert cur.fetchone() is None
+    response = client.post("/api/shorten", json={"url": "https://example.com"})
+    assert response.status_code == 201
@@ -0,0 +1,57 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import app as link_app
+
+
+def test_importing_app_starts_no_background_workers():
+    # Run in a fresh interpreter: other tests in this session start the workers.
+    script = (
+        "import threading, app; "
+        "print(sorted(t.name for t in threading.enumerate() if t.name.endswith(('-publisher', '-writer', '-tracker'))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "INIT_DB_ON_STARTUP": "false", "ANALYTICS_SERVICE_URL": "http://localhost:1"},
+        capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_start_background_starts_each_worker_once():
+    started = threading.Semaphore(0)
+    release = threading.Event()
+
+    def worker():
+        started.release()
+        release.wait()
+
+    link_app.start_background("test-worker", worker, count=2)
+    link_app.start_background("test-worker", worker, count=2)
+    try:
+        assert started.acquire(timeout=1) and started.acquire(timeout=1)
+        assert not started.acquire(timeout=0.1)
+    finally:
+        release.set()
+
+
+def test_drain_queue_returns_up_to_max_items():
+    q = queue.Queue()
+    for i in range(5):
+        q.put(i)
+    assert link_app.drain_queue(q, 3, interval=1) == [0, 1, 2]
+    assert link_app.drain_queue(q, 3, interval=1) == [3, 4]
+
+
+def test_drain_queue_stops_after_interval():
+    q = queue.Queue()
+    q.put("first")
+    threading.Timer(0.5, q.put, args=("late",)).start()
+    started = time.monotonic()
+    assert link_app.drain_queue(q, 10, interval=0.1) == ["first"]
+    assert time.monotonic() - started < 0.4
@@ -0,0 +1,134 @@
+import secrets
+import time
+
+import psycopg2.extensions
+import pytest
+
+import app as link_app
+
+AUTH = {"Authorization": "Bearer test-token"}
+
+
+def long_url():
+    # Random hex does not compress, so this is well past the btree row limit.
+    return "https://example.com/" + secrets.token_hex(4000)
+
+
+def test_shorten_accepts_long_urls(db, client):
+    url = long_url()
+    first = client.post("/api/shorten", json={"url": url})
+    again = client.post("/api/shorten", json={"url": url})
+    assert first.status_code == 201
+    assert again.get_json()["short_code"] == first.get_json()["short_code"]
+
+
+def test_bulk_shorten_accepts_long_urls(db, client):
+    urls = ["https://example.com/a", long_url()]
+    response = client.post("/api/shorten/bulk", json={"urls": urls})
+    assert response.status_code == 201
+    assert [link["original_url"] for link in response.get_json()["links"]] == urls
+
+
+def test_import_accepts_long_urls(db, client, monkeypatch):
+    monkeypatch.setattr(link_app, "LINK_IMPORT_TOKEN", "test-token")
+    body = "https://example.com/a\n" + long_url() + "\n"
+    response = client.post("/api/links/import", data=body, headers=AUTH)
+    assert response.status_code == 201
+    assert response.get_json() == {"received": 2, "imported": 2}
+
+
+def test_shorten_then_redirect(db, client):
+    shortened = client.post("/api/shorten", json={"url": "https://example.com/page"}).get_json()
+    assert shortened["short_url"].endswith("/" + shortened["short_code"])
+
+    response = client.get("/" + shortened["short_code"])
+    assert response.status_code == 302
+    assert response.location == "https://example.com/page"
+
+
+def test_redirect_unknown_code_is_404(db, client):
+    assert client.get("/doesnotexist").status_code == 404
+
+
+def test_redirect_records_click(db, client):
+    # A code no other test uses, so a click still in flight from an earlier
+    # test cannot be counted here.
+    short_code = "clicktest"
+    with db.cursor() as cur:
+        cur.execute("INSERT INTO links (short_code, original_url) VALUES (%s, 'https://example.com')", (short_code,))
+    assert client.get("/" + short_code).status_code == 302
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with db.cursor() as cur:
+            cur.execute("SELECT count(*) FROM link_clicks WHERE short_code = %s", (short_code,))
+            if cur.fetchone()[0] == 1:
+                return
+        time.sleep(0.1)
+    raise AssertionError("click was not written")
+
+
+def test_bulk_shorten_dedupes_and_reuses_codes(db, client):
+    existing = client.post("/api/shorten", json={"url": "https://example.com/b"}).get_json()["short_code"]
+    urls = ["https://example.com/a", " https://example.com/b ", "https://example.com/a", "https://example.com/c"]
+    links = client.post("/api/shorten/bulk", json={"urls": urls}).get_json()["links"]
+    assert [link["original_url"] for link in links] == [
+        "https://example.com/a", "https://example.com/b", "https://example.com/c",
+    ]
+    assert links[1]["short_code"] == existing
+    assert len({link["short_code"] for link in links}) == 3
+
+
+def test_import_skips_existing_and_duplicate_urls(db, client, monkeypatch):
+    monkeypatch.setattr(link_app, "LINK_IMPORT_TOKEN", "test-token")
+    client.post("/api/shorten", json={"url": "https://example.com/a"})
+    body = "https://example.com/a\nhttps://example.com/x\\y\tz\nhttps://example.com/x\\y\tz\n\n"
+    response = client.post("/api/links/import", data=body, headers=AUTH)
+    assert response.get_json() == {"received": 3, "imported": 1}
+    with db.cursor() as cur:
+        cur.execute("SELECT original_url FROM links ORDER BY id")
+        assert [row[0] for row in cur.fetchall()] == ["https://example.com/a", "https://example.com/x\\y\tz"]
+
+
+def test_get_links_pages_through_equal_timestamps(db, client):
+    with db.cursor() as cur:
+        cur.execute(
+            "INSERT INTO links (short_code, original_url, created_at) "
+            "SELECT 'c' || g, 'https://example.com/' || g, TIMESTAMP '2024-01-01' + (g / 2) * INTERVAL '1 second' "
+            "FROM generate_series(1, 5) AS g"
+        )
+    seen, cursor = [], None
+    while True:
+        query = "/api/links?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(query).get_json()
+        seen += [link["short_code"] for link in page["links"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["c5", "c4", "c3", "c2", "c1"]
+
+
+def test_failed_import_returns_connection_idle(db, client, monkeypatch):
+    monkeypatch.setattr(link_app, "LINK_IMPORT_TOKEN", "test-token")
+    # COPY rejects NUL bytes, failing the import after its transaction has begun.
+    response = client.post("/api/links/import", data="https://example.com/a\x00b\n", headers=AUTH)
+    assert response.status_code == 500
+    idle = link_app.get_db_pool()._pool
+    assert all(conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE for conn in idle)
+    assert idle[-1].autocommit  # the pool hands back the most recently returned connection first
+    assert client.post("/api/links/import", data="https://example.com/a\n", headers=AUTH).status_code == 201
+
+
+def test_interrupted_import_rolls_back(db, client, monkeypatch):
+    class Interrupted(BaseException):
+        """Stands in for GreenletExit or KeyboardInterrupt mid-import."""
+
+    def interrupt(payload):
+        raise Interrupted
+
+    monkeypatch.setattr(link_app, "LINK_IMPORT_TOKEN", "test-token")
+    # StringIO wraps the COPY payload, so this fires after the temp table is created.
+    monkeypatch.setattr(link_app.io, "StringIO", interrupt)
+    with pytest.raises(Interrupted):
+        client.post("/api/links/import", data="https://example.com/a\n", headers=AUTH)
+    idle = link_app.get_db_pool()._pool
+    assert all(conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE for conn in idle)
@@ -0,0 +1,53 @@
+import app as link_app
+
+
+def table_locks(conn, tables):
+    """Runs SCHEMA_SQL in an open transaction and returns the table locks it holds."""
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(link_app.SCHEMA_SQL)
+            cur.execute(
+                "SELECT c.relname, l.mode FROM pg_locks l JOIN pg_class c ON c.oid = l.relation "
+                "WHERE l.pid = pg_backend_pid() AND c.relname = ANY(%s)",
+                (list(tables),),
+            )
+            return cur.fetchall()
+    finally:
+        conn.rollback()
+        conn.autocommit = True
+
+
+def test_schema_rerun_does_not_lock_tables(db):
+    assert table_locks(db, ["links", "link_clicks"]) == []
+
+
+def test_schema_migrates_old_link_clicks(db):
+    with db.cursor() as cur:
+        cur.execute("DROP TABLE link_clicks")
+        cur.execute(
+            "CREATE TABLE link_clicks (id SERIAL PRIMARY KEY, short_code VARCHAR(16) NOT NULL, "
+            "clicked_at TIMESTAMP NOT NULL DEFAULT NOW())"
+        )
+        cur.execute("CREATE INDEX link_clicks_short_code_idx ON link_clicks (short_code)")
+        cur.execute("INSERT INTO link_clicks (short_code) VALUES ('a')")
+    link_app.ensure_tables(db)
+    with db.cursor() as cur:
+        cur.execute("SELECT column_name FROM information_schema.columns WHERE table_name = 'link_clicks' ORDER BY 1")
+        assert cur.fetchall() == [("clicked_at",), ("short_code",)]
+        cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'link_clicks'")
+        assert cur.fetchall() == [("link_clicks_short_code_clicked_at_idx",)]
+        cur.execute("SELECT count(*) FROM link_clicks")
+        assert cur.fetchone() == (1,)
+
+
+def test_schema_replaces_old_url_indexes(db):
+    with db.cursor() as cur:
+        cur.execute("DROP INDEX links_original_url_sha256_key")
+        cur.execute("CREATE UNIQUE INDEX links_original_url_md5_key ON links (md5(original_url))")
+    link_app.ensure_tables(db)
+    with db.cursor() as cur:
+        cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'links' ORDER BY 1")
+        assert cur.fetchall() == [
+            ("links_created_at_idx",), ("links_original_url_sha256_key",), ("links_pkey",), ("links_short_code_key",),
+        ]